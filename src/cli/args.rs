@@ -21,6 +21,10 @@ pub struct Args {
     #[argh(option, default = "String::from(\"snps\")")]
     pub mode: String,
 
+    /// compute several distance modes in one run (comma-separated, overrides --mode); --output must contain {mode}
+    #[argh(option)]
+    pub modes: Option<String>,
+
     /// output format: tsv, csv, phylip, nexus (default: tsv)
     #[argh(option, default = "String::from(\"tsv\")")]
     pub format: String,
@@ -85,6 +89,10 @@ pub struct Args {
     #[argh(option)]
     pub cache_file: Option<String>,
 
+    /// reuse parsed profiles across runs: "auto" (<profiles>.parsed.lz4) or a file path
+    #[argh(option)]
+    pub profile_cache: Option<String>,
+
     /// user note to save with the cache for future reference
     #[argh(option)]
     pub cache_note: Option<String>,
@@ -137,6 +145,10 @@ pub struct Args {
     #[argh(option, default = "20")]
     pub recombination_threshold: usize,
 
+    /// print a SHA-256 digest of each distance matrix instead of writing it (--output not needed)
+    #[argh(switch)]
+    pub digest_only: bool,
+
     /// show matrix statistics and diversity metrics only, then exit
     #[argh(switch)]
     pub stats_only: bool,
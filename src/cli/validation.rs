@@ -7,10 +7,14 @@ use regex::Regex;
 use std::collections::HashSet;
 use std::fs::File;
 use std::io::{BufRead, BufReader};
+use std::path::PathBuf;
 use std::str::FromStr;
 
 pub struct ValidationResult {
+    /// Mode used for alignment precomputation and cache metadata
     pub distance_mode: DistanceMode,
+    /// Modes to write a distance matrix for (one entry unless --modes is given)
+    pub output_modes: Vec<DistanceMode>,
     pub alignment_config: AlignmentConfig,
     pub sample_include_regex: Option<Regex>,
     pub sample_exclude_regex: Option<Regex>,
@@ -20,6 +24,8 @@ pub struct ValidationResult {
     pub samples_exclude_set: Option<HashSet<String>>,
     pub loci_include_set: Option<HashSet<String>>,
     pub loci_exclude_set: Option<HashSet<String>>,
+    /// Parsed-profile cache location resolved from --profile-cache
+    pub profile_cache_path: Option<PathBuf>,
 }
 
 /// Validate all command line arguments
@@ -48,6 +54,9 @@ pub fn validate_args(args: &Args) -> Result<ValidationResult, String> {
         if args.mode != "snps" {
             return Err(format!("Distance mode '{}' is not compatible with --hasher-type hamming (hamming works at allelic level)", args.mode));
         }
+        if args.modes.is_some() {
+            return Err("--modes is not compatible with --hasher-type hamming (hamming works at allelic level)".to_string());
+        }
     }
 
     // Validate cache-only mode
@@ -57,8 +66,34 @@ pub fn validate_args(args: &Args) -> Result<ValidationResult, String> {
         );
     }
 
-    // Validate distance mode
-    let distance_mode = DistanceMode::from_str(&args.mode)?;
+    // Validate distance mode(s)
+    let (distance_mode, output_modes) = if let Some(modes) = &args.modes {
+        let output_modes = modes
+            .split(',')
+            .map(|m| DistanceMode::from_str(m.trim()))
+            .collect::<Result<Vec<_>, _>>()?;
+
+        if let Some(output) = &args.output {
+            if !output.contains("{mode}") {
+                return Err(
+                    "--modes requires an --output path containing the {mode} placeholder"
+                        .to_string(),
+                );
+            }
+        }
+
+        // Precompute with an alignment-based mode so the cache holds real statistics
+        // that every requested mode can be derived from
+        let distance_mode = output_modes
+            .iter()
+            .copied()
+            .find(|m| *m != DistanceMode::Hamming)
+            .unwrap_or(output_modes[0]);
+        (distance_mode, output_modes)
+    } else {
+        let distance_mode = DistanceMode::from_str(&args.mode)?;
+        (distance_mode, vec![distance_mode])
+    };
 
     // Validate and create alignment config (skip for hamming hasher)
     let alignment_config = if args.hasher_type == "hamming" {
@@ -159,8 +194,19 @@ pub fn validate_args(args: &Args) -> Result<ValidationResult, String> {
         None
     };
 
+    // Resolve parsed-profile cache location
+    let profile_cache_path = match (args.profile_cache.as_deref(), args.profiles.as_ref()) {
+        (None, _) => None,
+        (Some("auto"), Some(profiles)) => Some(PathBuf::from(format!("{}.parsed.lz4", profiles))),
+        (Some("auto"), None) => {
+            return Err("--profile-cache auto requires --profiles".to_string());
+        }
+        (Some(path), _) => Some(PathBuf::from(path)),
+    };
+
     Ok(ValidationResult {
         distance_mode,
+        output_modes,
         alignment_config,
         sample_include_regex,
         sample_exclude_regex,
@@ -170,6 +216,7 @@ pub fn validate_args(args: &Args) -> Result<ValidationResult, String> {
         samples_exclude_set,
         loci_include_set,
         loci_exclude_set,
+        profile_cache_path,
     })
 }
 
@@ -203,3 +250,67 @@ fn load_set_from_file(file_path: &str) -> Result<HashSet<String>, String> {
     );
     Ok(set)
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use argh::FromArgs;
+
+    fn modes_args(output: &str, modes: &str, extra: &[&str]) -> Args {
+        let mut args = vec!["--profiles", "p.tsv", "--output", output, "--modes", modes];
+        args.extend_from_slice(extra);
+        Args::from_args(&["cgdist"], &args).expect("valid test arguments")
+    }
+
+    #[test]
+    fn test_modes_require_placeholder() {
+        let args = modes_args("out.tsv", "snps,hamming", &[]);
+        let err = validate_args(&args)
+            .err()
+            .expect("--modes without {mode} must be rejected");
+        assert!(err.contains("{mode}"));
+
+        let args = modes_args("out_{mode}.tsv", "snps,hamming", &[]);
+        assert!(validate_args(&args).is_ok());
+    }
+
+    #[test]
+    fn test_modes_precompute_mode() {
+        // The first alignment-based mode drives precomputation, even after hamming
+        let args = modes_args("out_{mode}.tsv", "hamming, snps-indel-bases,snps", &[]);
+        let result = validate_args(&args).unwrap();
+        assert_eq!(result.distance_mode, DistanceMode::SnpsAndIndelBases);
+        assert_eq!(
+            result.output_modes,
+            vec![
+                DistanceMode::Hamming,
+                DistanceMode::SnpsAndIndelBases,
+                DistanceMode::SnpsOnly
+            ]
+        );
+
+        // Hamming alone falls back to itself
+        let args = modes_args("out_{mode}.tsv", "hamming", &[]);
+        let result = validate_args(&args).unwrap();
+        assert_eq!(result.distance_mode, DistanceMode::Hamming);
+        assert_eq!(result.output_modes, vec![DistanceMode::Hamming]);
+    }
+
+    #[test]
+    fn test_modes_invalid() {
+        let args = modes_args("out_{mode}.tsv", "snps,bogus", &[]);
+        assert!(validate_args(&args).is_err());
+
+        let args = modes_args("out_{mode}.tsv", "snps", &["--hasher-type", "hamming"]);
+        assert!(validate_args(&args).is_err());
+    }
+
+    #[test]
+    fn test_single_mode_default() {
+        let args = Args::from_args(&["cgdist"], &["--profiles", "p.tsv", "--output", "out.tsv"])
+            .expect("valid test arguments");
+        let result = validate_args(&args).unwrap();
+        assert_eq!(result.distance_mode, DistanceMode::SnpsOnly);
+        assert_eq!(result.output_modes, vec![DistanceMode::SnpsOnly]);
+    }
+}
@@ -108,6 +108,16 @@ impl FromStr for DistanceMode {
 }
 
 impl DistanceMode {
+    /// Canonical CLI name of the mode (inverse of `from_str`)
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            DistanceMode::SnpsOnly => "snps",
+            DistanceMode::SnpsAndIndelEvents => "snps-indel-events",
+            DistanceMode::SnpsAndIndelBases => "snps-indel-bases",
+            DistanceMode::Hamming => "hamming",
+        }
+    }
+
     pub fn description(&self) -> &str {
         match self {
             DistanceMode::SnpsOnly => "SNPs only",
@@ -138,8 +138,8 @@ impl DistanceEngine {
             return 0; // Identical alleles
         }
 
-        // Fast path for hamming hasher
-        if self.hasher_type == "hamming" {
+        // Fast path for hamming hasher or Hamming mode (no alignment needed)
+        if self.hasher_type == "hamming" || mode == DistanceMode::Hamming {
             return 1; // Different CRCs = distance 1 for Hamming
         }
 
@@ -278,12 +278,7 @@ impl DistanceEngine {
             last_modified: now, // Move now instead of clone (last usage)
             alignment_config: self.config.clone(), // Keep clone - config is reused
             hasher_type: self.hasher_type.clone(), // Keep clone - hasher_type is reused
-            distance_mode: match distance_mode {
-                DistanceMode::SnpsOnly => "snps".to_string(),
-                DistanceMode::SnpsAndIndelEvents => "snps-indel-events".to_string(),
-                DistanceMode::SnpsAndIndelBases => "snps-indel-bases".to_string(),
-                DistanceMode::Hamming => "hamming".to_string(),
-            },
+            distance_mode: distance_mode.as_str().to_string(),
             user_note: self.cache_note.clone(),
             total_entries: self.cache.len(),
             unique_loci: unique_loci.len(),
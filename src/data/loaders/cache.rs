@@ -0,0 +1,200 @@
+// cache.rs - Parsed profile cache for repeated runs on the same input
+
+use crate::data::profile::AllelicMatrix;
+use serde::{Deserialize, Serialize};
+use std::path::Path;
+use std::time::UNIX_EPOCH;
+
+/// Identifies the source file and parse options a cached matrix was built from
+#[derive(Debug, PartialEq, Eq, Serialize, Deserialize)]
+struct ProfileFingerprint {
+    version: String,
+    hasher_type: String,
+    missing_char: String,
+    source_len: u64,
+    source_mtime_secs: u64,
+    source_mtime_nanos: u32,
+}
+
+impl ProfileFingerprint {
+    fn from_source(
+        source_path: &Path,
+        missing_char: &str,
+        hasher_type: &str,
+    ) -> Result<Self, String> {
+        let metadata = std::fs::metadata(source_path)
+            .map_err(|e| format!("Failed to stat profile file: {}", e))?;
+        let mtime = metadata
+            .modified()
+            .map_err(|e| format!("Failed to read profile modification time: {}", e))?
+            .duration_since(UNIX_EPOCH)
+            .map_err(|e| format!("Invalid profile modification time: {}", e))?;
+
+        Ok(Self {
+            version: env!("CARGO_PKG_VERSION").to_string(),
+            hasher_type: hasher_type.to_string(),
+            missing_char: missing_char.to_string(),
+            source_len: metadata.len(),
+            source_mtime_secs: mtime.as_secs(),
+            source_mtime_nanos: mtime.subsec_nanos(),
+        })
+    }
+}
+
+#[derive(Serialize)]
+struct ProfileCacheRef<'a> {
+    fingerprint: &'a ProfileFingerprint,
+    matrix: &'a AllelicMatrix,
+}
+
+#[derive(Deserialize)]
+struct ProfileCache {
+    fingerprint: ProfileFingerprint,
+    matrix: AllelicMatrix,
+}
+
+impl AllelicMatrix {
+    /// Load a previously parsed (unfiltered) matrix if it still matches the source file.
+    /// Returns None when the cache is missing, stale or unreadable.
+    pub fn load_profile_cache(
+        cache_path: &Path,
+        source_path: &Path,
+        missing_char: &str,
+        hasher_type: &str,
+    ) -> Option<Self> {
+        let compressed = std::fs::read(cache_path).ok()?;
+        let expected =
+            ProfileFingerprint::from_source(source_path, missing_char, hasher_type).ok()?;
+
+        let cache: ProfileCache = match lz4_flex::decompress_size_prepended(&compressed)
+            .map_err(|e| e.to_string())
+            .and_then(|data| bincode::deserialize(&data).map_err(|e| e.to_string()))
+        {
+            Ok(cache) => cache,
+            Err(e) => {
+                eprintln!(
+                    "⚠️  Ignoring unreadable profile cache {}: {}",
+                    cache_path.display(),
+                    e
+                );
+                return None;
+            }
+        };
+
+        if cache.fingerprint != expected {
+            return None;
+        }
+
+        println!(
+            "⚡ Profile cache hit: {} samples, {} loci from {}",
+            cache.matrix.samples.len(),
+            cache.matrix.loci_names.len(),
+            cache_path.display()
+        );
+        Some(cache.matrix)
+    }
+
+    /// Save the parsed (unfiltered) matrix so later runs on the same source can skip parsing
+    pub fn save_profile_cache(
+        &self,
+        cache_path: &Path,
+        source_path: &Path,
+        missing_char: &str,
+        hasher_type: &str,
+    ) -> Result<(), String> {
+        let fingerprint = ProfileFingerprint::from_source(source_path, missing_char, hasher_type)?;
+        let data = bincode::serialize(&ProfileCacheRef {
+            fingerprint: &fingerprint,
+            matrix: self,
+        })
+        .map_err(|e| format!("Failed to serialize profile cache: {}", e))?;
+        let compressed = lz4_flex::compress_prepend_size(&data);
+
+        // Write to a per-process temporary file and rename, so concurrent runs
+        // never observe a partially written cache
+        let tmp_path = format!("{}.{}.tmp", cache_path.display(), std::process::id());
+        std::fs::write(&tmp_path, &compressed)
+            .map_err(|e| format!("Failed to write profile cache: {}", e))?;
+        std::fs::rename(&tmp_path, cache_path)
+            .map_err(|e| format!("Failed to write profile cache: {}", e))?;
+
+        println!("💾 Profile cache saved to {}", cache_path.display());
+        Ok(())
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::data::profile::AllelicProfile;
+    use crate::hashers::AlleleHash;
+    use std::collections::HashMap;
+    use std::path::PathBuf;
+
+    fn temp_path(name: &str) -> PathBuf {
+        std::env::temp_dir().join(format!("cgdist_{}_{}", std::process::id(), name))
+    }
+
+    fn sample_matrix() -> AllelicMatrix {
+        let mut loci_hashes = HashMap::new();
+        loci_hashes.insert("locus1".to_string(), AlleleHash::Crc32(42));
+        loci_hashes.insert("locus2".to_string(), AlleleHash::Missing);
+        AllelicMatrix {
+            samples: vec![AllelicProfile {
+                sample_id: "sample1".to_string(),
+                loci_hashes,
+            }],
+            loci_names: vec!["locus1".to_string(), "locus2".to_string()],
+        }
+    }
+
+    #[test]
+    fn test_profile_cache_round_trip() {
+        let source = temp_path("round_trip.tsv");
+        let cache = temp_path("round_trip.tsv.parsed.lz4");
+        std::fs::write(&source, "sample\tlocus1\tlocus2\nsample1\t1\t-\n").unwrap();
+
+        let matrix = sample_matrix();
+        matrix
+            .save_profile_cache(&cache, &source, "-", "crc32")
+            .unwrap();
+
+        let loaded = AllelicMatrix::load_profile_cache(&cache, &source, "-", "crc32")
+            .expect("fresh cache must be accepted");
+        assert_eq!(loaded.loci_names, matrix.loci_names);
+        assert_eq!(loaded.samples.len(), 1);
+        assert_eq!(loaded.samples[0].sample_id, "sample1");
+        assert_eq!(loaded.samples[0].loci_hashes, matrix.samples[0].loci_hashes);
+
+        // Different parse options invalidate the cache
+        assert!(AllelicMatrix::load_profile_cache(&cache, &source, "-", "sha256").is_none());
+        assert!(AllelicMatrix::load_profile_cache(&cache, &source, "N", "crc32").is_none());
+
+        std::fs::remove_file(&source).ok();
+        std::fs::remove_file(&cache).ok();
+    }
+
+    #[test]
+    fn test_profile_cache_stale_source() {
+        let source = temp_path("stale.tsv");
+        let cache = temp_path("stale.tsv.parsed.lz4");
+        std::fs::write(&source, "sample\tlocus1\tlocus2\nsample1\t1\t-\n").unwrap();
+        sample_matrix()
+            .save_profile_cache(&cache, &source, "-", "crc32")
+            .unwrap();
+
+        // Rewriting the source changes its fingerprint
+        std::fs::write(
+            &source,
+            "sample\tlocus1\tlocus2\nsample1\t1\t-\nsample2\t2\t3\n",
+        )
+        .unwrap();
+        assert!(AllelicMatrix::load_profile_cache(&cache, &source, "-", "crc32").is_none());
+
+        // A missing cache file is simply a miss
+        std::fs::remove_file(&cache).ok();
+        assert!(AllelicMatrix::load_profile_cache(&cache, &source, "-", "crc32").is_none());
+
+        std::fs::remove_file(&source).ok();
+    }
+}
@@ -1,4 +1,5 @@
 // mod.rs - File loaders module
 
+pub mod cache;
 pub mod csv;
 pub mod tsv;
@@ -3,6 +3,7 @@
 use crate::hashers::AlleleHash;
 use rayon::prelude::*;
 use regex::Regex;
+use serde::{Deserialize, Serialize};
 use std::collections::{HashMap, HashSet};
 
 /// Genetic diversity metrics for the allelic matrix
@@ -15,14 +16,14 @@ pub struct DiversityMetrics {
 }
 
 /// Represents a single sample's allelic profile
-#[derive(Debug)]
+#[derive(Debug, Serialize, Deserialize)]
 pub struct AllelicProfile {
     pub sample_id: String,
     pub loci_hashes: HashMap<String, AlleleHash>,
 }
 
 /// Collection of allelic profiles with associated metadata
-#[derive(Debug)]
+#[derive(Debug, Serialize, Deserialize)]
 pub struct AllelicMatrix {
     pub samples: Vec<AllelicProfile>,
     pub loci_names: Vec<String>,
@@ -59,6 +60,7 @@ impl AllelicMatrix {
         loci_exclude: Option<&Regex>,
         loci_include_set: Option<&HashSet<String>>,
         loci_exclude_set: Option<&HashSet<String>>,
+        profile_cache: Option<&std::path::Path>,
     ) -> Result<Self, String> {
         println!(
             "📊 Loading allelic matrix with {} hasher: {}",
@@ -72,15 +74,35 @@ impl AllelicMatrix {
             .get_hasher(hasher_type)
             .ok_or_else(|| format!("Unknown hasher type: {}", hasher_type))?;
 
-        let extension = file_path
-            .extension()
-            .and_then(|s| s.to_str())
-            .unwrap_or("tsv");
+        // Reuse the parsed matrix from a previous run on the same file if possible
+        let cached = profile_cache.and_then(|cache_path| {
+            Self::load_profile_cache(cache_path, file_path, missing_char, hasher_type)
+        });
 
-        // Load the matrix with the specific hasher
-        let mut matrix = match extension {
-            "csv" => Self::from_csv_with_hasher(file_path, missing_char, hasher)?,
-            _ => Self::from_tsv_with_hasher(file_path, missing_char, hasher)?,
+        let mut matrix = match cached {
+            Some(matrix) => matrix,
+            None => {
+                let extension = file_path
+                    .extension()
+                    .and_then(|s| s.to_str())
+                    .unwrap_or("tsv");
+
+                // Load the matrix with the specific hasher
+                let matrix = match extension {
+                    "csv" => Self::from_csv_with_hasher(file_path, missing_char, hasher)?,
+                    _ => Self::from_tsv_with_hasher(file_path, missing_char, hasher)?,
+                };
+
+                // Filters are applied below, so the cache always holds the full matrix
+                if let Some(cache_path) = profile_cache {
+                    if let Err(e) =
+                        matrix.save_profile_cache(cache_path, file_path, missing_char, hasher_type)
+                    {
+                        eprintln!("⚠️  {}", e);
+                    }
+                }
+                matrix
+            }
         };
 
         // Show initial statistics
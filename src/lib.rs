@@ -29,6 +29,7 @@
 //!     0.0,  // locus threshold
 //!     None, None, None, None,  // filters
 //!     None, None, None, None,
+//!     None,  // parsed-profile cache
 //! )?;
 //!
 //! // Calculate distances
@@ -59,7 +60,7 @@ pub mod prelude {
     pub use crate::data::{AllelicMatrix, AllelicProfile, SequenceDatabase, SequenceInfo};
     pub use crate::hashers::{AlleleHash, AlleleHashPair, AlleleHasher, HasherRegistry};
     pub use crate::hashers::{Crc32Hasher, Md5Hasher, SequenceHasher, Sha256Hasher};
-    pub use crate::output::write_matrix;
+    pub use crate::output::{matrix_digest, write_matrix};
 }
 
 // Re-export main types at the root level for convenience
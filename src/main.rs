@@ -58,7 +58,7 @@ fn run_main() -> Result<(), String> {
     // Validate required parameters when not using inspector
     let profiles = args.profiles.as_ref().ok_or("--profiles is required")?;
 
-    let output = if args.stats_only || args.benchmark || args.cache_only {
+    let output = if args.stats_only || args.benchmark || args.cache_only || args.digest_only {
         None
     } else {
         Some(args.output.as_ref().ok_or("--output is required")?)
@@ -128,6 +128,7 @@ fn run_main() -> Result<(), String> {
         validation_result.loci_exclude_regex.as_ref(),
         validation_result.loci_include_set.as_ref(),
         validation_result.loci_exclude_set.as_ref(),
+        validation_result.profile_cache_path.as_deref(),
     ) {
         Ok(m) => m,
         Err(e) => {
@@ -180,9 +181,14 @@ fn run_main() -> Result<(), String> {
     if args.hasher_type == "hamming" {
         println!("\n🎯 Distance calculation: Hamming hasher (allelic level)");
     } else {
+        let mode_descriptions: Vec<&str> = validation_result
+            .output_modes
+            .iter()
+            .map(|m| m.description())
+            .collect();
         println!(
             "\n🎯 Distance calculation mode: {} ({})",
-            validation_result.distance_mode.description(),
+            mode_descriptions.join(", "),
             if args.no_hamming_fallback {
                 "no Hamming fallback"
             } else {
@@ -384,28 +390,49 @@ fn run_main() -> Result<(), String> {
         );
     }
 
-    // Calculate distance matrix
-    println!("\n🔄 Computing distance matrix...");
-    let distance_matrix = calculate_distance_matrix(
-        &matrix.samples,
-        &matrix.loci_names,
-        &engine,
-        validation_result.distance_mode,
-        args.min_loci,
-        args.no_hamming_fallback,
-    );
+    // Calculate and write one distance matrix per requested mode, reusing the
+    // loaded profiles, sequences and alignment cache across modes
+    let mut output_paths = Vec::with_capacity(validation_result.output_modes.len());
+    for &mode in &validation_result.output_modes {
+        println!("\n🔄 Computing distance matrix ({})...", mode.description());
+        let distance_matrix = calculate_distance_matrix(
+            &matrix.samples,
+            &matrix.loci_names,
+            &engine,
+            mode,
+            args.min_loci,
+            args.no_hamming_fallback,
+        );
 
-    // Write output
-    let output_path = output.unwrap(); // Safe because stats_only returns early
-    if let Err(e) = write_matrix(
-        output_path,
-        &args.format,
-        &matrix.samples,
-        &distance_matrix,
-        &command_line,
-    ) {
-        eprintln!("❌ ERROR writing output: {}", e);
-        std::process::exit(1);
+        // Digest-only runs print a comparable fingerprint instead of writing the matrix
+        if args.digest_only {
+            println!(
+                "DIGEST {}: {}",
+                mode.as_str(),
+                matrix_digest(&matrix.samples, &distance_matrix)
+            );
+            continue;
+        }
+
+        let output_template = output.unwrap(); // Safe because stats_only/digest_only skip writing
+        let output_path = if args.modes.is_some() {
+            output_template.replace("{mode}", mode.as_str())
+        } else {
+            output_template.clone()
+        };
+
+        // Write output
+        if let Err(e) = write_matrix(
+            &output_path,
+            &args.format,
+            &matrix.samples,
+            &distance_matrix,
+            &command_line,
+        ) {
+            eprintln!("❌ ERROR writing output: {}", e);
+            std::process::exit(1);
+        }
+        output_paths.push(output_path);
     }
 
     // Save cache if specified (skip for hamming hasher) and only if there are new entries
@@ -475,7 +502,9 @@ fn run_main() -> Result<(), String> {
         matrix.samples.len(),
         matrix.loci_names.len()
     );
-    println!("📁 Output written to: {}", output_path);
+    if !output_paths.is_empty() {
+        println!("📁 Output written to: {}", output_paths.join(", "));
+    }
     println!("🔧 Command: {}", command_line);
 
     Ok(())
@@ -517,6 +546,7 @@ fn run_benchmark(args: &Args) -> Result<(), String> {
         validation_result.loci_exclude_regex.as_ref(),
         validation_result.loci_include_set.as_ref(),
         validation_result.loci_exclude_set.as_ref(),
+        validation_result.profile_cache_path.as_deref(),
     ) {
         Ok(m) => m,
         Err(e) => return Err(format!("Failed to load profiles: {}", e)),
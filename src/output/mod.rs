@@ -222,6 +222,26 @@ pub fn write_nexus(
     Ok(())
 }
 
+/// SHA-256 digest of a distance matrix, independent of output format and header.
+/// Covers the sample order and every cell in row-major order (NA encoded as u64::MAX).
+pub fn matrix_digest(samples: &[AllelicProfile], matrix: &[Vec<Option<usize>>]) -> String {
+    use sha2::{Digest, Sha256};
+    let mut hasher = Sha256::new();
+
+    for sample in samples {
+        hasher.update(sample.sample_id.as_bytes());
+        hasher.update([0u8]);
+    }
+    for row in matrix {
+        for cell in row {
+            let value = cell.map_or(u64::MAX, |d| d as u64);
+            hasher.update(value.to_le_bytes());
+        }
+    }
+
+    format!("{:x}", hasher.finalize())
+}
+
 /// Write distance matrix in the specified format
 pub fn write_matrix(
     file_path: &str,
@@ -241,3 +261,70 @@ pub fn write_matrix(
         )),
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::collections::HashMap;
+
+    fn profiles(ids: &[&str]) -> Vec<AllelicProfile> {
+        ids.iter()
+            .map(|id| AllelicProfile {
+                sample_id: id.to_string(),
+                loci_hashes: HashMap::new(),
+            })
+            .collect()
+    }
+
+    #[test]
+    fn test_matrix_digest_stable() {
+        let samples = profiles(&["s1", "s2"]);
+        let matrix = vec![vec![Some(0), Some(3)], vec![Some(3), None]];
+
+        // Pinned value: the digest is compared across runs and builds, so its
+        // encoding (ids + NUL, then u64 LE cells) must not drift
+        assert_eq!(
+            matrix_digest(&samples, &matrix),
+            "35c47abe9c2c93b4f002d8a686882e0615df5a10c9e13e844c18bb0490e495fe"
+        );
+        assert_eq!(
+            matrix_digest(&samples, &matrix),
+            matrix_digest(&samples, &matrix.clone())
+        );
+    }
+
+    #[test]
+    fn test_matrix_digest_na_encoding() {
+        let samples = profiles(&["s1", "s2"]);
+        let with_na = vec![vec![Some(0), None], vec![None, Some(0)]];
+        let with_zero = vec![vec![Some(0), Some(0)], vec![Some(0), Some(0)]];
+        let as_max = vec![
+            vec![Some(0), Some(u64::MAX as usize)],
+            vec![Some(u64::MAX as usize), Some(0)],
+        ];
+
+        assert_ne!(
+            matrix_digest(&samples, &with_na),
+            matrix_digest(&samples, &with_zero)
+        );
+        // NA is encoded as u64::MAX
+        assert_eq!(
+            matrix_digest(&samples, &with_na),
+            matrix_digest(&samples, &as_max)
+        );
+    }
+
+    #[test]
+    fn test_matrix_digest_covers_samples() {
+        let matrix = vec![vec![Some(0), Some(1)], vec![Some(1), Some(0)]];
+        let digest = matrix_digest(&profiles(&["s1", "s2"]), &matrix);
+
+        assert_eq!(digest.len(), 64);
+        assert_ne!(digest, matrix_digest(&profiles(&["s2", "s1"]), &matrix));
+        // The NUL separator keeps "ab","c" distinct from "a","bc"
+        assert_ne!(
+            matrix_digest(&profiles(&["ab", "c"]), &matrix),
+            matrix_digest(&profiles(&["a", "bc"]), &matrix)
+        );
+    }
+}
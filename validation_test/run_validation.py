@@ -3,17 +3,79 @@
 Corrected validation script for cgDist with accurate expected values.
 """
 
-import pandas as pd
+import functools
+import hashlib
+import json
+import os
+import numpy as np
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# On-disk cache of expected distances, keyed on the sequence inputs
+EXPECTED_CACHE = '.expected_cache.json'
+
+# Distance modes in the order they are stacked along the first tensor axis
+MODES = ('hamming', 'snps', 'snps_indel_events', 'snps_indel_bases')
+MODE_TO_AXIS = {mode: axis for axis, mode in enumerate(MODES)}
 
 def load_distance_matrix(filepath):
-    """Load a distance matrix from TSV file."""
+    """Load a distance matrix from TSV file as (sample names, int32 matrix)."""
     with open(filepath, 'r') as f:
-        lines = [line for line in f if not line.startswith('#')]
+        header = next(line for line in f if not line.startswith('#'))
+        names = header.rstrip('\n').split('\t')[1:]
+        matrix = np.loadtxt(f, dtype=np.int32, delimiter='\t',
+                            usecols=range(1, len(names) + 1), ndmin=2)
+    return names, matrix
+
+def tsv_fingerprint(filepath):
+    """Return the (mtime in ns, size) pair that identifies a TSV's current contents."""
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+@functools.lru_cache(maxsize=16)
+def load_distance_matrix_cached(filepath, tsv_mtime_ns, tsv_size):
+    """Load a distance matrix through a memory-mapped .npy sidecar.
+    
+    The TSV is parsed once and saved next to it as ``<file>.npy`` plus a
+    ``<file>.names.json`` holding the sample names and the TSV fingerprint
+    (mtime in ns and size) they were built from. Later runs map the array
+    read-only only while that fingerprint matches exactly, so a TSV replaced
+    by an older copy is parsed again. Within a process, results are memoized
+    on (filepath, tsv_mtime_ns, tsv_size); callers pass tsv_fingerprint().
+    """
+    npy_path = filepath + '.npy'
+    names_path = filepath + '.names.json'
+    
+    sidecar = None
+    if os.path.exists(npy_path) and os.path.exists(names_path):
+        with open(names_path, 'r') as f:
+            sidecar = json.load(f)
     
-    from io import StringIO
-    df = pd.read_csv(StringIO(''.join(lines)), sep='\t', index_col=0)
-    return df
+    if not (isinstance(sidecar, dict) and sidecar.get('tsv_mtime_ns') == tsv_mtime_ns
+            and sidecar.get('tsv_size') == tsv_size):
+        names, matrix = load_distance_matrix(filepath)
+        # The array is written first, so a sidecar never describes a stale .npy
+        np.save(npy_path, matrix)
+        sidecar = {'tsv_mtime_ns': tsv_mtime_ns, 'tsv_size': tsv_size, 'names': names}
+        with open(names_path, 'w') as f:
+            json.dump(sidecar, f)
+    
+    return sidecar['names'], np.load(npy_path, mmap_mode='r')
+
+def load_distance_tensor(paths):
+    """Load one matrix per mode, in parallel, into a (n_modes, n, n) int32 tensor.
+    
+    Returns (names, stacked); raises ValueError if the matrices do not
+    share the same sample order.
+    """
+    # Parsing runs in NumPy's C loader, so threads overlap the reads and parses
+    with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+        loaded = list(executor.map(lambda path: load_distance_matrix_cached(path, *tsv_fingerprint(path)), paths))
+    names = loaded[0][0]
+    for path, (path_names, _) in zip(paths, loaded):
+        if path_names != names:
+            raise ValueError(f"Sample order of {path} differs from {paths[0]}")
+    return names, np.stack([matrix for _, matrix in loaded])
 
 def manual_sequence_analysis():
     """Manually analyze sequences to determine correct expected values."""
@@ -54,57 +116,89 @@ def manual_sequence_analysis():
         'Sample_Mixed1': ('snp2', 'del5', 'complex1'),  # Need to check snp2
     }
     
-    # Calculate expected distances
-    expected_distances = {}
+    # Pairs whose alleles are either substitution-only or a single InDel,
+    # so the expected values follow directly from the sequences
+    pairs = [
+        ('Sample_Ref', 'Sample_SNPs_Only'),   # 1 + 1 + 2 SNPs
+        ('Sample_Ref', 'Sample_Dels_Only'),   # 0 SNPs (→3 Hamming fallback), 3 del events, 4 del bases
+        ('Sample_Ref', 'Sample_Ins_Only'),    # 0 SNPs (→3 Hamming fallback), 3 ins events, 7 ins bases
+    ]
     
-    # Sample_Ref vs Sample_SNPs_Only
-    # locus1: ref vs snp1 = 1 SNP
-    # locus2: ref vs snp1 = 1 SNP  
-    # locus3: ref vs snp3 = 2 SNPs
-    # Total: 4 SNPs
-    expected_distances[('Sample_Ref', 'Sample_SNPs_Only')] = {
-        'hamming': 3,
-        'snps': 4,
-        'snps_indel_events': 4,
-        'snps_indel_bases': 4
-    }
+    return load_expected_distances(sequences, sample_profiles, pairs)
+
+def encode_profile(sequences, alleles, width):
+    """Encode a sample's alleles as a zero-padded (n_loci, width) byte matrix plus lengths."""
+    encoded = np.zeros((len(alleles), width), dtype=np.uint8)
+    lengths = np.zeros(len(alleles), dtype=np.int32)
+    for row, (locus, allele) in enumerate(zip(sequences, alleles)):
+        seq = np.frombuffer(sequences[locus][allele].encode(), dtype=np.uint8)
+        encoded[row, :len(seq)] = seq
+        lengths[row] = len(seq)
+    return encoded, lengths
+
+def compute_expected_distances(sequences, sample_profiles, pairs):
+    """Derive expected distances for each pair from the allele sequences.
     
-    # Sample_Ref vs Sample_Dels_Only  
-    # locus1: ref vs del1 = 0 SNPs, 1 del event, 1 del base
-    # locus2: ref vs del2 = 0 SNPs, 1 del event, 2 del bases
-    # locus3: ref vs del1 = 0 SNPs, 1 del event, 1 del base
-    # Total: 0 SNPs (→3 Hamming fallback), 3 del events, 4 del bases
-    expected_distances[('Sample_Ref', 'Sample_Dels_Only')] = {
-        'hamming': 3,
-        'snps': 3,  # Hamming fallback
-        'snps_indel_events': 3,  # 0 SNPs + 3 InDel events
-        'snps_indel_bases': 4   # 0 SNPs + 4 InDel bases
+    Equal-length alleles are compared position by position (SNPs only);
+    alleles of different length are treated as a single InDel event
+    spanning the length difference.
+    """
+    width = max(len(seq) for alleles in sequences.values() for seq in alleles.values())
+    encoded = {
+        sample: encode_profile(sequences, sample_profiles[sample], width)
+        for pair in pairs for sample in pair
     }
     
-    # Sample_Ref vs Sample_Ins_Only
-    # locus1: ref vs ins1 = 0 SNPs, 1 ins event, 1 ins base
-    # locus2: ref vs ins2 = 0 SNPs, 1 ins event, 2 ins bases  
-    # locus3: ref vs ins4 = 0 SNPs, 1 ins event, 4 ins bases
-    # Total: 0 SNPs (→3 Hamming fallback), 3 ins events, 7 ins bases
-    expected_distances[('Sample_Ref', 'Sample_Ins_Only')] = {
-        'hamming': 3,
-        'snps': 3,  # Hamming fallback
-        'snps_indel_events': 3,  # 0 SNPs + 3 InDel events
-        'snps_indel_bases': 7   # 0 SNPs + 7 InDel bases
-    }
+    expected_distances = {}
+    for sample1, sample2 in pairs:
+        seqs1, lens1 = encoded[sample1]
+        seqs2, lens2 = encoded[sample2]
+        
+        same_length = lens1 == lens2
+        snps = np.where(same_length, (seqs1 != seqs2).sum(axis=1), 0)
+        indel_events = (~same_length).astype(np.int32)
+        indel_bases = np.abs(lens1 - lens2)
+        differs = (snps > 0) | ~same_length
+        
+        expected_distances[(sample1, sample2)] = {
+            'hamming': int(differs.sum()),
+            'snps': int(np.where(differs & (snps == 0), 1, snps).sum()),  # Hamming fallback
+            'snps_indel_events': int((snps + indel_events).sum()),
+            'snps_indel_bases': int((snps + indel_bases).sum())
+        }
     
     return expected_distances
 
+def load_expected_distances(sequences, sample_profiles, pairs):
+    """Return expected distances, recomputing them only when the inputs change."""
+    key = hashlib.sha1(json.dumps([sequences, sample_profiles, pairs], sort_keys=True).encode()).hexdigest()
+    
+    if os.path.exists(EXPECTED_CACHE):
+        with open(EXPECTED_CACHE, 'r') as f:
+            cache = json.load(f)
+        if cache.get('key') == key:
+            return {tuple(pair): expected for pair, expected in cache['expected']}
+    
+    expected_distances = compute_expected_distances(sequences, sample_profiles, pairs)
+    with open(EXPECTED_CACHE, 'w') as f:
+        json.dump({
+            'key': key,
+            'expected': [[list(pair), expected] for pair, expected in expected_distances.items()]
+        }, f)
+    return expected_distances
+
 def validate_cgdist():
     """Main validation function."""
     
-    # Load matrices
-    matrices = {
-        'hamming': load_distance_matrix('results/crc32_hamming.tsv'),
-        'snps': load_distance_matrix('results/crc32_snps.tsv'),
-        'snps_indel_events': load_distance_matrix('results/crc32_snps_indel_events.tsv'),
-        'snps_indel_bases': load_distance_matrix('results/crc32_snps_indel_bases.tsv')
-    }
+    # Load matrices; all must share one sample order so integer positions are valid across modes
+    try:
+        names, stacked = load_distance_tensor([f'results/crc32_{mode}.tsv' for mode in MODES])
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    
+    # Resolve sample names to integer positions once
+    idx = {name: i for i, name in enumerate(names)}
     
     # Get corrected expected values
     expected_distances = manual_sequence_analysis()
@@ -121,8 +215,9 @@ def validate_cgdist():
     print("   Expected: All distances = 0 (identical sequences)")
     print("-" * 60)
     
-    for mode, matrix in matrices.items():
-        actual = int(matrix.loc[test_pair[0], test_pair[1]])
+    i, j = idx[test_pair[0]], idx[test_pair[1]]
+    for mode in MODES:
+        actual = int(stacked[MODE_TO_AXIS[mode], i, j])
         if actual == 0:
             status = "✅ PASS"
         else:
@@ -136,8 +231,9 @@ def validate_cgdist():
         print("-" * 60)
         
         test_passed = True
+        i, j = idx[pair[0]], idx[pair[1]]
         for mode, exp_val in expected.items():
-            actual = int(matrices[mode].loc[pair[0], pair[1]])
+            actual = int(stacked[MODE_TO_AXIS[mode], i, j])
             
             if actual == exp_val:
                 status = "✅ PASS"
@@ -158,16 +254,19 @@ def validate_cgdist():
     print("MATHEMATICAL INVARIANT CHECK (cgDist ≥ Hamming):")
     print("=" * 80)
     
-    invariant_violations = 0
-    for sample1 in matrices['hamming'].index:
-        for sample2 in matrices['hamming'].columns:
-            if sample1 != sample2:  # Skip diagonal
-                hamming_dist = int(matrices['hamming'].loc[sample1, sample2])
-                snps_dist = int(matrices['snps'].loc[sample1, sample2])
-                
-                if snps_dist < hamming_dist:
-                    print(f"❌ VIOLATED: {sample1} vs {sample2}: SNPs({snps_dist}) < Hamming({hamming_dist})")
-                    invariant_violations += 1
+    hamming, snps = stacked[MODE_TO_AXIS['hamming']], stacked[MODE_TO_AXIS['snps']]
+    mask = np.empty(hamming.shape, dtype=bool)
+    np.less(snps, hamming, out=mask)
+    np.fill_diagonal(mask, False)  # Skip diagonal
+    rows, cols = np.where(mask)
+    invariant_violations = rows.size
+    if invariant_violations:
+        # Gather the violating values in one fancy-indexing pass per mode
+        violations = zip(rows.tolist(), cols.tolist(), snps[rows, cols].tolist(), hamming[rows, cols].tolist())
+        print('\n'.join(
+            f"❌ VIOLATED: {names[i]} vs {names[j]}: SNPs({s}) < Hamming({h})"
+            for i, j, s, h in violations
+        ))
     
     if invariant_violations == 0:
         print("✅ Mathematical invariant maintained for all pairs")
@@ -181,12 +280,13 @@ def validate_cgdist():
     print("=" * 80)
     
     print("\\nDistance from Sample_Ref to all samples:")
-    for mode, matrix in matrices.items():
+    ref = idx['Sample_Ref']
+    for mode in MODES:
         print(f"\\n{mode.upper()}:")
-        ref_distances = matrix.loc['Sample_Ref'].sort_values()
-        for sample, dist in ref_distances.items():
-            if sample != 'Sample_Ref':
-                print(f"  {sample:18s}: {int(dist):3d}")
+        ref_distances = stacked[MODE_TO_AXIS[mode], ref]
+        for j in np.argsort(ref_distances, kind='stable'):
+            if j != ref:
+                print(f"  {names[j]:18s}: {int(ref_distances[j]):3d}")
     
     # Final result
     print("\n" + "=" * 80)
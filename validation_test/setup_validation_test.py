@@ -4,12 +4,38 @@ Create a controlled validation test for cgDist with known SNPs and InDels.
 This script generates FASTA schema files and allelic profiles with CRC32 hashes.
 """
 
+import hashlib
+import pickle
 import zlib
 import os
+import numpy as np
 
-def crc32_hash(sequence):
-    """Calculate CRC32 hash of a sequence."""
-    return zlib.crc32(sequence.encode('utf-8')) & 0xffffffff
+# 1 MB write buffer so each generated file is flushed in a single syscall
+WRITE_BUFFER_SIZE = 1 << 20
+
+# FASTA record for a (CRC32 hash, encoded sequence) pair
+FASTA_RECORD = b'>%d\n%s\n'
+
+def crc32_hashes(sequences):
+    """Calculate CRC32 hashes for a batch of UTF-8 encoded sequences.
+    
+    Uses zlib's polynomial, which is what cgdist's crc32 hasher (and
+    chewBBACA) expect, so CRC32C is not an option here.
+    """
+    return list(map(zlib.crc32, sequences))
+
+def load_cached_hashes(cache_path, fasta_paths):
+    """Return cached allele hashes if the cache exists and no FASTA file changed."""
+    if not os.path.exists(cache_path):
+        return None
+    
+    with open(cache_path, 'rb') as f:
+        hashes, mtimes = pickle.load(f)
+    
+    for path in fasta_paths:
+        if not os.path.exists(path) or os.path.getmtime(path) != mtimes.get(path):
+            return None
+    return hashes
 
 def create_test_cases():
     """Create controlled test cases with known differences."""
@@ -51,21 +77,36 @@ def create_test_cases():
     # Create schema directory
     os.makedirs('schema_crc32', exist_ok=True)
     
+    # Reuse the previous run if the test cases and FASTA files are unchanged
+    cache_key = hashlib.blake2b(repr(test_cases).encode(), digest_size=16).hexdigest()
+    cache_path = f'schema_crc32/.cache_{cache_key}.pkl'
+    fasta_paths = {locus: f'schema_crc32/{locus}.fasta' for locus in test_cases}
+    
+    hashes = load_cached_hashes(cache_path, fasta_paths.values())
+    if hashes is not None:
+        print(f'Schema unchanged, reusing {cache_path}')
+        return hashes, test_cases
+    
+    # Encode once, then hash every allele of every locus in one batch
+    encoded = {locus: [seq.encode('utf-8') for _, seq in sequences] for locus, sequences in test_cases.items()}
+    all_hashes = iter(crc32_hashes(seq for seqs in encoded.values() for seq in seqs))
+    
     # Create FASTA files and collect CRC32 hashes
     hashes = {}
     
     for locus, sequences in test_cases.items():
-        fasta_path = f'schema_crc32/{locus}.fasta'
-        hashes[locus] = {}
+        fasta_path = fasta_paths[locus]
+        hash_vals = [next(all_hashes) for _ in sequences]
+        hashes[locus] = {name: hash_val for (name, _), hash_val in zip(sequences, hash_vals)}
         
-        with open(fasta_path, 'w') as f:
-            for name, seq in sequences:
-                hash_val = crc32_hash(seq)
-                hashes[locus][name] = hash_val
-                f.write(f'>{hash_val}\n{seq}\n')
+        with open(fasta_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(b''.join([FASTA_RECORD % record for record in zip(hash_vals, encoded[locus])]))
         
         print(f'Created {fasta_path} with {len(sequences)} alleles')
     
+    with open(cache_path, 'wb') as f:
+        pickle.dump((hashes, {path: os.path.getmtime(path) for path in fasta_paths.values()}), f)
+    
     return hashes, test_cases
 
 def create_test_profiles(hashes):
@@ -85,15 +126,18 @@ def create_test_profiles(hashes):
         ('Sample_Large_Ins', 'ins3', 'ins2', 'complex2'),  # Large insertions (3+2+4=9)
     ]
     
+    # Build the (n_samples, n_loci) matrix of allele hashes
+    loci = ('locus1', 'locus2', 'locus3')
+    names = np.array([sample[0] for sample in samples], dtype=object)
+    alleles = np.array(
+        [[hashes[locus][allele] for locus, allele in zip(loci, sample[1:])] for sample in samples],
+        dtype=np.uint32
+    )
+    
     # Create profiles file
-    with open('profiles/test_profiles_crc32.tsv', 'w') as f:
-        f.write('sample\tlocus1\tlocus2\tlocus3\n')
-        for sample_data in samples:
-            sample_name = sample_data[0]
-            locus1_allele = hashes['locus1'][sample_data[1]]
-            locus2_allele = hashes['locus2'][sample_data[2]]
-            locus3_allele = hashes['locus3'][sample_data[3]]
-            f.write(f'{sample_name}\t{locus1_allele}\t{locus2_allele}\t{locus3_allele}\n')
+    with open('profiles/test_profiles_crc32.tsv', 'w', buffering=WRITE_BUFFER_SIZE) as f:
+        np.savetxt(f, np.column_stack([names, alleles]), fmt=['%s'] + ['%u'] * len(loci),
+                   delimiter='\t', header='sample\t' + '\t'.join(loci), comments='')
     
     print(f'\nCreated profiles/test_profiles_crc32.tsv with {len(samples)} samples')
     
@@ -102,24 +146,12 @@ def create_test_profiles(hashes):
 def generate_expected_results(test_cases, samples):
     """Generate documentation of expected results."""
     
-    doc = """# Expected Results for CRC32 Validation Test
-
-## Test Sequences
-
-### Locus 1:
-"""
-    for name, seq in test_cases['locus1']:
-        doc += f"- {name}: `{seq}`\n"
-    
-    doc += "\n### Locus 2:\n"
-    for name, seq in test_cases['locus2']:
-        doc += f"- {name}: `{seq}`\n"
+    parts = ["# Expected Results for CRC32 Validation Test\n\n## Test Sequences"]
+    for number, locus in enumerate(('locus1', 'locus2', 'locus3'), start=1):
+        parts.append(f"\n### Locus {number}:")
+        parts.extend(f"- {name}: `{seq}`" for name, seq in test_cases[locus])
     
-    doc += "\n### Locus 3:\n"
-    for name, seq in test_cases['locus3']:
-        doc += f"- {name}: `{seq}`\n"
-    
-    doc += """
+    parts.append("""
 
 ## Expected Key Distances
 
@@ -159,10 +191,10 @@ def generate_expected_results(test_cases, samples):
 - Hamming fallback: When SNPs=0 but InDels exist, SNPs mode returns 1 per locus
 - The exact alignment results depend on Parasail's global alignment algorithm
 - Gap penalties affect how InDels are counted as events vs bases
-"""
+""")
     
-    with open('EXPECTED_RESULTS_CRC32.md', 'w') as f:
-        f.write(doc)
+    with open('EXPECTED_RESULTS_CRC32.md', 'w', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write('\n'.join(parts))
     
     print('\nCreated EXPECTED_RESULTS_CRC32.md')
 
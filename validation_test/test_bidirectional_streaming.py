@@ -7,9 +7,38 @@ Validates that the new implementation works correctly and maintains compatibilit
 import subprocess
 import pandas as pd
 import os
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Worker threads given to each cgdist run
+CGDIST_THREADS = 16
+
+# Lines of cgdist stdout/stderr kept for the final report
+OUTPUT_TAIL_LINES = 20
+
+# Known recombination log column types, so pandas skips dtype inference
+RECOMB_DTYPES = {
+    'locus': 'string', 'sample1': 'string', 'sample2': 'string',
+    'allele1_hash': 'uint64', 'allele2_hash': 'uint64',
+    'best_distance': 'int32', 'threshold': 'int32',
+    'seq_length1': 'int32', 'seq_length2': 'int32',
+    'divergence_percent': 'float64',
+    # Optional in RecombinationResult, so a cell may be empty: nullable Int32
+    'distance_forward': 'Int32', 'distance_reverse_complement': 'Int32',
+    'alignment_direction': 'string',
+}
+
+def drain_stream(stream, tail, prefix=None):
+    """Read a child stream to EOF, keeping only its last lines (echoed live if prefix is set)."""
+    for line in stream:
+        tail.append(line)
+        if prefix is not None:
+            print(f"{prefix}{line}", end='')
+    stream.close()
+
 def run_cgdist_test(test_name, profiles_path, cache_path, output_path, recomb_log_path, threshold=5):
     """Run cgdist with streaming recombination detection"""
     cmd = [
@@ -22,7 +51,7 @@ def run_cgdist_test(test_name, profiles_path, cache_path, output_path, recomb_lo
         "--locus-threshold", "0.98",
         "--cache-file", cache_path,
         "--alignment-mode", "dna-strict",
-        "--threads", "16",  # Use fewer threads for testing
+        "--threads", str(CGDIST_THREADS),  # Use fewer threads for testing
         "--recombination-log", recomb_log_path,
         "--recombination-threshold", str(threshold)
     ]
@@ -34,19 +63,42 @@ def run_cgdist_test(test_name, profiles_path, cache_path, output_path, recomb_lo
     
     try:
         print(f"  Running command...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)  # 5 min timeout
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   text=True, bufsize=1 << 20)
+        
+        # Stream both pipes so only the last lines stay in memory
+        stdout_tail = deque(maxlen=OUTPUT_TAIL_LINES)
+        stderr_tail = deque(maxlen=OUTPUT_TAIL_LINES)
+        readers = [
+            threading.Thread(target=drain_stream, args=(process.stdout, stdout_tail, f"  [{test_name}] "), daemon=True),
+            threading.Thread(target=drain_stream, args=(process.stderr, stderr_tail), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        
+        try:
+            returncode = process.wait(timeout=300)  # 5 min timeout
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            for reader in readers:
+                reader.join()
         
         end_time = time.time()
         duration = end_time - start_time
+        stdout = ''.join(stdout_tail)
+        stderr = ''.join(stderr_tail)
         
-        if result.returncode == 0:
+        if returncode == 0:
             print(f"✅ {test_name} completed in {duration:.1f}s")
-            print(f"  STDOUT: {result.stdout[-200:]}")  # Last 200 chars
+            print(f"  STDOUT: {stdout[-200:]}")  # Last 200 chars
             return True, duration
         else:
             print(f"❌ {test_name} failed:")
-            print(f"  STDOUT: {result.stdout}")
-            print(f"  STDERR: {result.stderr}")
+            print(f"  STDOUT: {stdout}")
+            print(f"  STDERR: {stderr}")
             return False, duration
             
     except subprocess.TimeoutExpired:
@@ -56,6 +108,19 @@ def run_cgdist_test(test_name, profiles_path, cache_path, output_path, recomb_lo
         print(f"❌ {test_name} error: {e}")
         return False, 0
 
+def run_cgdist_tests(configs):
+    """Run several cgdist test configurations concurrently.
+    
+    Each config holds the run_cgdist_test arguments. Threads are enough since
+    the work happens in the cgdist child processes; the pool is sized so that
+    concurrent runs do not oversubscribe the cores each run already uses.
+    Returns the (success, duration) of each config, in order.
+    """
+    max_workers = max(1, min(len(configs), (os.cpu_count() or 1) // CGDIST_THREADS))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_cgdist_test, *config) for config in configs]
+        return [future.result() for future in futures]
+
 def validate_output_files(output_path, recomb_log_path):
     """Validate that output files are created and contain expected data"""
     results = {}
@@ -77,7 +142,7 @@ def validate_output_files(output_path, recomb_log_path):
     # Check recombination log
     if os.path.exists(recomb_log_path):
         try:
-            df_recomb = pd.read_csv(recomb_log_path)
+            df_recomb = pd.read_csv(recomb_log_path, dtype=RECOMB_DTYPES, engine='c')
             results['recomb_events'] = len(df_recomb)
             results['recomb_exists'] = True
             
@@ -116,8 +181,8 @@ def compare_with_reference(test_recomb_log, reference_recomb_log):
         return {}
     
     try:
-        df_test = pd.read_csv(test_recomb_log)
-        df_ref = pd.read_csv(reference_recomb_log)
+        df_test = pd.read_csv(test_recomb_log, dtype=RECOMB_DTYPES, engine='c')
+        df_ref = pd.read_csv(reference_recomb_log, dtype=RECOMB_DTYPES, engine='c')
         
         # Compare basic statistics
         comparison = {
@@ -168,8 +233,8 @@ def main():
         
         # Create small test subset (first 50 samples for quick testing)
         try:
-            df_full = pd.read_csv("/home/IZSNT/a.deruvo/cgDist-paper/supplementary_data/Se1540_allelic_profiles.tsv", sep='\t')
-            df_small = df_full.head(50)  # Just 50 samples for quick test
+            # Only parse the first 50 samples for quick test
+            df_small = pd.read_csv("/home/IZSNT/a.deruvo/cgDist-paper/supplementary_data/Se1540_allelic_profiles.tsv", sep='\t', nrows=50)
             df_small.to_csv(profiles_path, sep='\t', index=False)
             print(f"✅ Created test subset: {len(df_small)} samples")
         except Exception as e:
@@ -183,8 +248,7 @@ def main():
     
     # Remove old output files
     for file_path in [output_path, recomb_log_path]:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        Path(file_path).unlink(missing_ok=True)
     
     # Build the project first
     print("🔨 Building cgdist...")
@@ -195,14 +259,9 @@ def main():
     print("✅ Build successful")
     
     # Run test
-    success, duration = run_cgdist_test(
-        "Bidirectional Streaming Test",
-        profiles_path,
-        cache_path, 
-        output_path,
-        recomb_log_path,
-        threshold=5
-    )
+    [(success, duration)] = run_cgdist_tests([
+        ("Bidirectional Streaming Test", profiles_path, cache_path, output_path, recomb_log_path, 5),
+    ])
     
     if not success:
         print("❌ Test failed - cannot proceed with validation")
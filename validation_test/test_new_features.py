@@ -3,32 +3,73 @@
 Test script for new cgDist features: cache-only mode and recombination detection.
 """
 
+import csv
+import shlex
 import subprocess
 import os
 import sys
-import pandas as pd
+from pathlib import Path
 
-def run_command(cmd, description):
-    """Run a command and check its exit status."""
+# cgdist binary, resolved once to an absolute path (bytes, passed straight to execve)
+CGDIST = os.fsencode(Path("../target/release/cgdist").resolve())
+
+# cgdist invocation shared by every test; each test appends its own options
+BASE_ARGS = (
+    CGDIST,
+    "--schema", "schema_crc32",
+    "--profiles", "profiles/test_profiles_crc32.tsv",
+    "--hasher-type", "crc32",
+)
+
+# Parsed-profile cache written next to the profiles by --profile-cache auto
+PROFILE_CACHE = "profiles/test_profiles_crc32.tsv.parsed.lz4"
+
+# Columns every recombination log must provide
+RECOMBINATION_LOG_COLUMNS = frozenset([
+    'locus', 'sample1', 'sample2', 'allele1_hash', 'allele2_hash',
+    'snps_indel_bases', 'threshold', 'seq_length1', 'seq_length2',
+    'divergence_percent'
+])
+
+def run_command(argv, description):
+    """Run a command (argv sequence, no shell) and check its exit status.
+    
+    Returns the completed process on success, None otherwise.
+    """
     print(f"\n🧪 Testing: {description}")
-    print(f"Command: {cmd}")
+    print(f"Command: {shlex.join(map(os.fsdecode, argv))}")
     
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=30)
+        result = subprocess.run(argv, capture_output=True, text=True, timeout=30)
         if result.returncode != 0:
             print(f"❌ FAILED: {description}")
             print(f"STDOUT: {result.stdout}")
             print(f"STDERR: {result.stderr}")
-            return False
+            return None
         else:
             print(f"✅ PASSED: {description}")
-            return True
+            return result
     except subprocess.TimeoutExpired:
         print(f"⏰ TIMEOUT: {description}")
-        return False
+        return None
     except Exception as e:
         print(f"❌ ERROR: {description} - {e}")
-        return False
+        return None
+
+def read_recombination_log(path):
+    """Read a recombination log CSV, returning (column names, rows as dicts)."""
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    return reader.fieldnames or [], rows
+
+def existing_results():
+    """Return the names of the files in results/ from a single directory scan."""
+    try:
+        with os.scandir("results") as entries:
+            return {entry.name for entry in entries}
+    except FileNotFoundError:
+        return set()
 
 def test_cache_only_mode():
     """Test cache-only functionality."""
@@ -38,50 +79,53 @@ def test_cache_only_mode():
     
     # Clean up previous cache files
     cache_files = [
-        "results/test_cache_only_new.lz4",
-        "results/test_from_cache_new.tsv"
+        "test_cache_only_new.lz4",
+        "test_from_cache_new.tsv"
     ]
     for f in cache_files:
-        if os.path.exists(f):
-            os.remove(f)
+        Path("results", f).unlink(missing_ok=True)
+    # Start without parsed profiles so Test 1 writes them and Test 2 must reuse them
+    Path(PROFILE_CACHE).unlink(missing_ok=True)
     
     tests_passed = 0
-    total_tests = 3
+    total_tests = 4
     
     # Test 1: Cache-only mode
-    cmd = ("../target/release/cgdist --schema schema_crc32 "
-           "--profiles profiles/test_profiles_crc32.tsv "
-           "--mode snps-indel-bases --hasher-type crc32 "
-           "--cache-file results/test_cache_only_new.lz4 --cache-only "
-           "--cache-note 'Testing cache-only mode'")
+    cmd = BASE_ARGS + ("--mode", "snps-indel-bases",
+                       "--cache-file", "results/test_cache_only_new.lz4", "--cache-only",
+                       "--cache-note", "Testing cache-only mode", "--profile-cache", "auto")
     
     if run_command(cmd, "Cache-only mode execution"):
-        if os.path.exists("results/test_cache_only_new.lz4"):
+        if "test_cache_only_new.lz4" in existing_results():
             print("✅ Cache file created successfully")
             tests_passed += 1
         else:
             print("❌ Cache file not found")
     
     # Test 2: Using cached data
-    cmd = ("../target/release/cgdist --schema schema_crc32 "
-           "--profiles profiles/test_profiles_crc32.tsv "
-           "--output results/test_from_cache_new.tsv "
-           "--mode snps-indel-bases --hasher-type crc32 "
-           "--cache-file results/test_cache_only_new.lz4")
-    
-    if run_command(cmd, "Using cached data"):
-        if os.path.exists("results/test_from_cache_new.tsv"):
+    cmd = BASE_ARGS + ("--output", "results/test_from_cache_new.tsv",
+                       "--mode", "snps-indel-bases",
+                       "--cache-file", "results/test_cache_only_new.lz4", "--profile-cache", "auto")
+    
+    result = run_command(cmd, "Using cached data")
+    if result:
+        if "test_from_cache_new.tsv" in existing_results():
             print("✅ Matrix created from cache successfully")
             tests_passed += 1
         else:
             print("❌ Output matrix not found")
+        
+        # The profiles parsed by Test 1 must be loaded from --profile-cache auto
+        if "Profile cache hit" in result.stdout:
+            print("✅ Parsed profiles loaded from the profile cache")
+            tests_passed += 1
+        else:
+            print("❌ Profile cache was not used on the second run")
     
     # Test 3: Validate cache error handling (cache-only without cache-file)
-    cmd = ("../target/release/cgdist --schema schema_crc32 "
-           "--profiles profiles/test_profiles_crc32.tsv "
-           "--mode snps-indel-bases --hasher-type crc32 --cache-only")
+    cmd = BASE_ARGS + ("--mode", "snps-indel-bases", "--cache-only")
     
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    result = subprocess.run(cmd, capture_output=True, text=True)
     if result.returncode != 0 and "requires --cache-file" in result.stderr:
         print("✅ Cache-only validation works correctly")
         tests_passed += 1
@@ -101,28 +145,25 @@ def test_recombination_detection():
     
     # Clean up previous files
     log_files = [
-        "results/recomb_low_threshold.csv",
-        "results/recomb_high_threshold.csv",
-        "results/test_recomb_matrix.tsv"
+        "recomb_low_threshold.csv",
+        "recomb_high_threshold.csv",
+        "test_recomb_matrix.tsv"
     ]
     for f in log_files:
-        if os.path.exists(f):
-            os.remove(f)
+        Path("results", f).unlink(missing_ok=True)
     
     # Test 1: Low threshold (should detect many events)
-    cmd = ("../target/release/cgdist --schema schema_crc32 "
-           "--profiles profiles/test_profiles_crc32.tsv "
-           "--output results/test_recomb_matrix.tsv "
-           "--mode snps-indel-bases --hasher-type crc32 "
-           "--recombination-log results/recomb_low_threshold.csv "
-           "--recombination-threshold 3")
+    cmd = BASE_ARGS + ("--output", "results/test_recomb_matrix.tsv",
+                       "--mode", "snps-indel-bases",
+                       "--recombination-log", "results/recomb_low_threshold.csv",
+                       "--recombination-threshold", "3")
     
     if run_command(cmd, "Recombination detection (low threshold)"):
-        if os.path.exists("results/recomb_low_threshold.csv"):
+        if "recomb_low_threshold.csv" in existing_results():
             try:
-                df = pd.read_csv("results/recomb_low_threshold.csv")
-                if len(df) > 0:
-                    print(f"✅ Detected {len(df)} recombination events (threshold=3)")
+                _, rows = read_recombination_log("results/recomb_low_threshold.csv")
+                if len(rows) > 0:
+                    print(f"✅ Detected {len(rows)} recombination events (threshold=3)")
                     tests_passed += 1
                 else:
                     print("❌ No events detected with low threshold")
@@ -132,51 +173,49 @@ def test_recombination_detection():
             print("❌ Recombination log not created")
     
     # Test 2: High threshold (should detect fewer/no events)  
-    cmd = ("../target/release/cgdist --schema schema_crc32 "
-           "--profiles profiles/test_profiles_crc32.tsv "
-           "--output results/test_recomb_matrix.tsv "
-           "--mode snps-indel-bases --hasher-type crc32 "
-           "--recombination-log results/recomb_high_threshold.csv "
-           "--recombination-threshold 50")
-    
-    if run_command(cmd, "Recombination detection (high threshold)"):
-        if os.path.exists("results/recomb_high_threshold.csv"):
+    cmd = BASE_ARGS + ("--output", "results/test_recomb_matrix.tsv",
+                       "--mode", "snps-indel-bases",
+                       "--recombination-log", "results/recomb_high_threshold.csv",
+                       "--recombination-threshold", "50")
+    
+    high_passed = run_command(cmd, "Recombination detection (high threshold)")
+    # Nothing else writes to results/ after this point, so one scan serves Tests 2-4
+    existing = existing_results()
+    if high_passed:
+        if "recomb_high_threshold.csv" in existing:
             try:
-                df = pd.read_csv("results/recomb_high_threshold.csv")
-                print(f"✅ Detected {len(df)} recombination events (threshold=50)")
+                _, rows = read_recombination_log("results/recomb_high_threshold.csv")
+                print(f"✅ Detected {len(rows)} recombination events (threshold=50)")
                 tests_passed += 1
             except Exception as e:
                 print(f"❌ Error reading recombination log: {e}")
         else:
             print("❌ Recombination log not created")
     
-    # Test 3: Validate CSV format
-    if os.path.exists("results/recomb_low_threshold.csv"):
+    # Tests 3 and 4 share a single parse of the low-threshold log
+    low_log = None
+    if "recomb_low_threshold.csv" in existing:
         try:
-            df = pd.read_csv("results/recomb_low_threshold.csv")
-            expected_columns = [
-                'locus', 'sample1', 'sample2', 'allele1_hash', 'allele2_hash',
-                'snps_indel_bases', 'threshold', 'seq_length1', 'seq_length2', 
-                'divergence_percent'
-            ]
-            
-            if all(col in df.columns for col in expected_columns):
-                print("✅ CSV format is correct")
-                tests_passed += 1
-            else:
-                print("❌ CSV format is incorrect")
-                print(f"Expected: {expected_columns}")
-                print(f"Found: {list(df.columns)}")
+            low_log = read_recombination_log("results/recomb_low_threshold.csv")
         except Exception as e:
-            print(f"❌ Error validating CSV format: {e}")
+            print(f"❌ Error reading recombination log: {e}")
+    
+    # Test 3: Validate CSV format
+    if low_log is not None:
+        columns, low_rows = low_log
+        if RECOMBINATION_LOG_COLUMNS.issubset(columns):
+            print("✅ CSV format is correct")
+            tests_passed += 1
+        else:
+            print("❌ CSV format is incorrect")
+            print(f"Expected: {sorted(RECOMBINATION_LOG_COLUMNS)}")
+            print(f"Found: {list(columns)}")
     
     # Test 4: Validate divergence percentages are calculated
-    if os.path.exists("results/recomb_low_threshold.csv"):
+    if low_log is not None:
         try:
-            df = pd.read_csv("results/recomb_low_threshold.csv")
-            if len(df) > 0:
-                divergence_values = df['divergence_percent']
-                if all(0 <= val <= 100 for val in divergence_values):
+            if len(low_rows) > 0:
+                if all(0.0 <= float(row['divergence_percent']) <= 100.0 for row in low_rows):
                     print("✅ Divergence percentages are valid")
                     tests_passed += 1
                 else:
@@ -194,6 +233,10 @@ def main():
     print("🧪 cgDist New Features Validation Test")
     print("=" * 70)
     
+    if not os.path.isfile(CGDIST):
+        print(f"❌ cgdist binary not found at {os.fsdecode(CGDIST)} - build it with 'cargo build --release'")
+        return False
+    
     total_passed = 0
     total_tests = 0
     
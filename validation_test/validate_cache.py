@@ -9,30 +9,153 @@ Validates cache consistency by:
 4. Checking cache integrity and metadata
 """
 
+import argparse
+import concurrent.futures
 import subprocess
+import numpy as np
 import pandas as pd
 import sys
 import json
 import os
+import re
+import threading
 from pathlib import Path
 
-def run_cgdist(args):
-    """Run cgDist and return stdout, stderr, returncode."""
-    cmd = ['../target/release/cgdist'] + args
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return result.stdout, result.stderr, result.returncode
+# cgdist binary, resolved once to an absolute path (bytes, passed straight to execve)
+CGDIST = os.fsencode(Path('../target/release/cgdist').resolve())
+
+# Input options shared by every distance run; each test appends its own options
+BASE_ARGS = (
+    '--schema', 'schema_crc32',
+    '--profiles', 'profiles/test_profiles_crc32.tsv',
+    '--hasher-type', 'crc32',
+)
+
+# One "DIGEST <mode>: <sha256>" line per mode is printed by --digest-only runs
+DIGEST_LINE = re.compile(r'^DIGEST (\S+): ([0-9a-f]{64})$', re.MULTILINE)
+
+# Full cache hit reported by cgdist; matched on raw stdout bytes, whatever the entry count
+CACHE_HIT_LINE = re.compile(rb"Already in cache:\s+\d+\s+\(100\.0%\)")
+
+def run_cgdist(args, started=None):
+    """Run cgDist and return stdout, stderr, returncode.
+    
+    If started is a list, the process is appended to it so the caller can
+    terminate it early.
+    """
+    cmd = [CGDIST, *args]
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as process:
+        if started is not None:
+            started.append(process)
+        stdout, stderr = process.communicate()
+    return stdout, stderr, process.returncode
+
+def run_cgdist_scan(args, pattern):
+    """Run cgDist and report whether any stdout line matches the compiled bytes pattern.
+    
+    stdout is streamed and discarded line by line as raw bytes (never decoded),
+    and is drained to EOF after a match so cgDist never blocks on a full pipe.
+    Returns (found, stderr, returncode).
+    """
+    cmd = [CGDIST, *args]
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        stderr_lines = []
+        reader = threading.Thread(target=stderr_lines.extend, args=(process.stderr,), daemon=True)
+        reader.start()
+        
+        found = False
+        for line in process.stdout:
+            if pattern.search(line):
+                found = True
+                break
+        for _ in process.stdout:
+            pass
+        
+        returncode = process.wait()
+        reader.join()
+    return found, b''.join(stderr_lines).decode(errors='replace'), returncode
+
+def output_template(use_cache):
+    """--output path of one side of the cache comparison; cgDist fills in {mode}."""
+    return f"results/cache_test_{{mode}}_{'with' if use_cache else 'without'}.tsv"
+
+def output_paths(modes, use_cache):
+    """Matrix path each mode is written to by one side of the cache comparison."""
+    template = output_template(use_cache)
+    return {mode: template.replace('{mode}', mode) for mode in modes}
+
+def run_cgdist_modes(modes, use_cache, cache_file, digest_only=False, started=None):
+    """Compute all distance modes in one cgDist run, from the cache or with --force-recompute.
+    
+    With digest_only nothing is written and the mapping holds each mode's matrix
+    digest instead of its output path.
+    Returns (use_cache, returncode, stdout, stderr, {mode: output_path_or_digest}).
+    """
+    if digest_only:
+        args = BASE_ARGS + ('--digest-only', '--modes', ','.join(modes))
+    else:
+        args = BASE_ARGS + ('--output', output_template(use_cache), '--modes', ','.join(modes))
+    args += ('--cache-file', cache_file) if use_cache else ('--force-recompute',)
+    stdout, stderr, rc = run_cgdist(args, started)
+    if digest_only:
+        outputs = dict(DIGEST_LINE.findall(stdout))
+    else:
+        outputs = output_paths(modes, use_cache)
+    return use_cache, rc, stdout, stderr, outputs
+
+def run_with_and_without_cache(modes, cache_file, digest_only=False, fail_fast=False):
+    """Run the cached and the recomputed cgDist side concurrently.
+    
+    Both runs execute in cgdist child processes, so threads are enough to
+    overlap them. With fail_fast, a failed run cancels the other one, or
+    terminates it if it is already running; that side is reported with
+    returncode None. Output paths are recorded for both sides whatever their
+    status, since a terminated run may already have written some of them.
+    Returns {use_cache: (returncode, stderr, outputs)}.
+    """
+    runs = {
+        use_cache: (None, "skipped after the other run failed (--fail-fast)",
+                    {} if digest_only else output_paths(modes, use_cache))
+        for use_cache in (True, False)
+    }
+    started = []
+    max_workers = max(1, (os.cpu_count() or 1) - 2)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(run_cgdist_modes, modes, use_cache, cache_file, digest_only, started)
+            for use_cache in (True, False)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            use_cache, rc, stdout, stderr, outputs = future.result()
+            runs[use_cache] = (rc, stderr, outputs)
+            if fail_fast and rc != 0:
+                # as_completed never yields futures cancelled by shutdown, so stop here
+                executor.shutdown(wait=False, cancel_futures=True)
+                for process in started:
+                    if process.poll() is None:
+                        process.terminate()
+                break
+    return runs
 
 def load_distance_matrix(filepath):
-    """Load a distance matrix from TSV file."""
-    with open(filepath, 'r') as f:
-        lines = [line for line in f if not line.startswith('#')]
+    """Load a distance matrix from TSV file.
     
-    from io import StringIO
-    df = pd.read_csv(StringIO(''.join(lines)), sep='\t', index_col=0)
-    return df
+    Only the leading '#' header lines are skipped ('#' is valid inside a sample
+    name), then the open file is handed to the parser without being buffered
+    and re-joined in Python.
+    """
+    with open(filepath, 'r') as f:
+        start = f.tell()
+        while f.readline().startswith('#'):
+            start = f.tell()
+        f.seek(start)
+        return pd.read_csv(f, sep='\t', index_col=0)
 
-def validate_cache_consistency():
-    """Test that cache produces consistent results across distance modes."""
+def validate_cache_consistency(fail_fast=False):
+    """Test that cache produces consistent results across distance modes.
+    
+    With fail_fast, stop at the first failing mode instead of checking them all.
+    """
     
     print("=" * 80)
     print("CACHE CONSISTENCY VALIDATION")
@@ -43,9 +166,6 @@ def validate_cache_consistency():
         print("❌ Cache file not found. Run with --cache-file first.")
         return False
     
-    schema_dir = "schema_crc32"
-    profiles = "profiles/test_profiles_crc32.tsv"
-    
     distance_modes = [
         ("hamming", "Hamming distance"),
         ("snps", "SNPs only"), 
@@ -53,63 +173,96 @@ def validate_cache_consistency():
         ("snps-indel-bases", "SNPs + InDel bases")
     ]
     
+    # One cgdist run per side covers every mode, sharing the profile, schema
+    # and cache load. Matrix digests are compared first; only modes whose
+    # digests are missing or differ are written out and compared in full.
+    modes = [mode for mode, _ in distance_modes]
+    digest_runs = run_with_and_without_cache(modes, cache_file, digest_only=True, fail_fast=fail_fast)
+    (rc_with, _, digests_with), (rc_without, _, digests_without) = digest_runs[True], digest_runs[False]
+    
+    # A failed digest run is already a failure; don't start the full-matrix runs
+    if fail_fast and (rc_with != 0 or rc_without != 0):
+        for use_cache, label in ((True, "with cache"), (False, "without cache")):
+            rc, stderr, _ = digest_runs[use_cache]
+            if rc is None:
+                print(f"⏭️  Digest run {label} {stderr}")
+            elif rc != 0:
+                print(f"❌ Failed digest run {label}: {stderr}")
+        print("\n⏭️  Skipping full matrix comparison (--fail-fast)")
+        return False, {mode: False for mode in modes}
+    
+    matching_digests = set()
+    if rc_with == 0 and rc_without == 0:
+        matching_digests = {mode for mode in modes
+                            if mode in digests_with and digests_with[mode] == digests_without.get(mode)}
+    
+    # Every unmatched mode gets full matrices: a failed or terminated digest run
+    # says nothing about whether that mode's full comparison will fail
+    fallback_modes = [mode for mode in modes if mode not in matching_digests]
+    runs = run_with_and_without_cache(fallback_modes, cache_file, fail_fast=fail_fast) if fallback_modes else {}
+    
     results = {}
     all_passed = True
     
     for mode, description in distance_modes:
-        print(f"\n📊 Testing {description} mode...")
+        if fail_fast and not all_passed:
+            print("\n⏭️  Skipping remaining modes (--fail-fast)")
+            break
         
-        # Test 1: With cache
-        output_with_cache = f"results/cache_test_{mode}_with.tsv"
-        stdout, stderr, rc = run_cgdist([
-            '--schema', schema_dir,
-            '--profiles', profiles, 
-            '--output', output_with_cache,
-            '--mode', mode,
-            '--hasher-type', 'crc32',
-            '--cache-file', cache_file
-        ])
+        print(f"\n📊 Testing {description} mode...")
         
-        if rc != 0:
-            print(f"❌ Failed with cache: {stderr}")
-            all_passed = False
+        if mode in matching_digests:
+            print(f"   ✅ PASS - Matrices identical with/without cache")
+            results[mode] = True
             continue
-            
-        # Test 2: Without cache (force recompute)
-        output_without_cache = f"results/cache_test_{mode}_without.tsv"
-        stdout, stderr, rc = run_cgdist([
-            '--schema', schema_dir,
-            '--profiles', profiles,
-            '--output', output_without_cache, 
-            '--mode', mode,
-            '--hasher-type', 'crc32',
-            '--force-recompute'
-        ])
         
-        if rc != 0:
-            print(f"❌ Failed without cache: {stderr}")
+        # Both runs must have succeeded before their outputs can be read; a side
+        # cancelled or terminated by --fail-fast has returncode None
+        run_failed = False
+        for use_cache, label in ((True, "with cache"), (False, "without cache")):
+            rc, stderr, _ = runs[use_cache]
+            if rc is None:
+                print(f"   ⏭️  Run {label} {stderr}")
+                run_failed = True
+            elif rc != 0:
+                print(f"❌ Failed {label}: {stderr}")
+                run_failed = True
+        if run_failed:
+            results[mode] = False
             all_passed = False
             continue
-            
+        
+        output_with_cache = runs[True][2][mode]
+        output_without_cache = runs[False][2][mode]
+        
         # Compare results
         try:
             matrix_with = load_distance_matrix(output_with_cache)
             matrix_without = load_distance_matrix(output_without_cache)
             
-            # Check if matrices are identical
-            if matrix_with.equals(matrix_without):
+            values_with = matrix_with.to_numpy()
+            values_without = matrix_without.to_numpy()
+            same_labels = (matrix_with.index.equals(matrix_without.index)
+                           and matrix_with.columns.equals(matrix_without.columns))
+            
+            # Check if matrices are identical (NA cells match each other, as with DataFrame.equals)
+            if same_labels and np.array_equal(values_with, values_without, equal_nan=True):
                 print(f"   ✅ PASS - Matrices identical with/without cache")
                 results[mode] = True
             else:
                 print(f"   ❌ FAIL - Matrices differ with/without cache")
                 # Show differences
-                diff_mask = matrix_with != matrix_without
-                if diff_mask.any().any():
-                    print("   Differences found:")
-                    for i in matrix_with.index:
-                        for j in matrix_with.columns:
-                            if diff_mask.loc[i, j]:
-                                print(f"     {i} vs {j}: with_cache={matrix_with.loc[i, j]}, without_cache={matrix_without.loc[i, j]}")
+                if not same_labels:
+                    print("   Sample labels differ between the two matrices")
+                elif values_with.shape == values_without.shape:
+                    both_na = np.isnan(values_with) & np.isnan(values_without)
+                    diff_idx = np.argwhere((values_with != values_without) & ~both_na)
+                    if len(diff_idx):
+                        rows = matrix_with.index.to_numpy()
+                        cols = matrix_with.columns.to_numpy()
+                        print("   Differences found:")
+                        for i, j in diff_idx:
+                            print(f"     {rows[i]} vs {cols[j]}: with_cache={values_with[i, j]}, without_cache={values_without[i, j]}")
                 results[mode] = False
                 all_passed = False
                 
@@ -117,13 +270,12 @@ def validate_cache_consistency():
             print(f"   ❌ Error comparing matrices: {e}")
             results[mode] = False
             all_passed = False
-            
-        # Clean up test files
-        try:
-            os.remove(output_with_cache)
-            os.remove(output_without_cache)
-        except:
-            pass
+    
+    # Clean up test files, including those of modes skipped by --fail-fast or
+    # written by one side before the other failed
+    for _, _, output_paths in runs.values():
+        for output_path in output_paths.values():
+            Path(output_path).unlink(missing_ok=True)
     
     return all_passed, results
 
@@ -174,26 +326,21 @@ def validate_cache_performance():
     print("=" * 80)
     
     cache_file = "results/validation_cache.lz4"
-    schema_dir = "schema_crc32"
-    profiles = "profiles/test_profiles_crc32.tsv"
     
     # Test with cache - should be fast
     print("🚀 Testing with cache (should be fast)...")
-    stdout, stderr, rc = run_cgdist([
-        '--schema', schema_dir,
-        '--profiles', profiles,
+    # Look for cache hit information in output
+    cache_hit, stderr, rc = run_cgdist_scan(BASE_ARGS + (
         '--output', 'results/perf_test_cached.tsv',
         '--mode', 'snps-indel-bases',
-        '--hasher-type', 'crc32', 
         '--cache-file', cache_file
-    ])
+    ), CACHE_HIT_LINE)
     
     if rc != 0:
         print(f"❌ Failed with cache: {stderr}")
         return False
     
-    # Look for cache hit information in output
-    if "Already in cache: 70 (100.0%)" in stdout:
+    if cache_hit:
         print("   ✅ PASS - 100% cache hit rate achieved")
         cache_performance = True
     else:
@@ -201,26 +348,30 @@ def validate_cache_performance():
         cache_performance = False
     
     # Clean up
-    try:
-        os.remove('results/perf_test_cached.tsv')
-    except:
-        pass
+    Path('results/perf_test_cached.tsv').unlink(missing_ok=True)
         
     return cache_performance
 
-def main():
-    """Main validation function."""
+def main(fail_fast=False):
+    """Main validation function.
+    
+    With fail_fast, the remaining tests are skipped after the first failure.
+    """
     
     print("🔍 cgDist Cache Validation Suite")
     print("=" * 80)
     print("Validating cache consistency, metadata, and performance...")
     print()
     
+    if not os.path.isfile(CGDIST):
+        print(f"❌ cgdist binary not found at {os.fsdecode(CGDIST)} - build it with 'cargo build --release'")
+        return False
+    
     all_tests_passed = True
     
     # Test 1: Cache consistency across distance modes
     try:
-        consistency_passed, mode_results = validate_cache_consistency()
+        consistency_passed, mode_results = validate_cache_consistency(fail_fast)
         if not consistency_passed:
             all_tests_passed = False
     except Exception as e:
@@ -228,22 +379,28 @@ def main():
         all_tests_passed = False
         
     # Test 2: Cache metadata validation
-    try:
-        metadata_passed = validate_cache_metadata()
-        if not metadata_passed:
+    if fail_fast and not all_tests_passed:
+        print("\n⏭️  Skipping metadata and performance validation (--fail-fast)")
+    else:
+        try:
+            metadata_passed = validate_cache_metadata()
+            if not metadata_passed:
+                all_tests_passed = False
+        except Exception as e:
+            print(f"❌ Cache metadata test failed: {e}")
             all_tests_passed = False
-    except Exception as e:
-        print(f"❌ Cache metadata test failed: {e}")
-        all_tests_passed = False
         
-    # Test 3: Cache performance validation
-    try:
-        performance_passed = validate_cache_performance()
-        if not performance_passed:
-            all_tests_passed = False
-    except Exception as e:
-        print(f"❌ Cache performance test failed: {e}")
-        all_tests_passed = False
+        # Test 3: Cache performance validation
+        if fail_fast and not all_tests_passed:
+            print("\n⏭️  Skipping performance validation (--fail-fast)")
+        else:
+            try:
+                performance_passed = validate_cache_performance()
+                if not performance_passed:
+                    all_tests_passed = False
+            except Exception as e:
+                print(f"❌ Cache performance test failed: {e}")
+                all_tests_passed = False
     
     # Final summary
     print("\n" + "=" * 80)
@@ -261,5 +418,9 @@ def main():
     return all_tests_passed
 
 if __name__ == '__main__':
-    success = main()
+    parser = argparse.ArgumentParser(description="Validate cgDist cache consistency, metadata and performance.")
+    parser.add_argument('--fail-fast', action='store_true',
+                        help="stop at the first failing distance mode or test")
+    args = parser.parse_args()
+    success = main(fail_fast=args.fail_fast)
     sys.exit(0 if success else 1)
\ No newline at end of file